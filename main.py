@@ -1,3 +1,5 @@
+import heapq  # Binary heap used as priority queue for expanded nodes
+import itertools
 from timeit import default_timer as timer  # To calculate elapsed time
 
 
@@ -6,21 +8,27 @@ class UcsNode:
     Represents a tree node. Takes arguments suitable for solving
     the pancake flipping sort problem using UCS algorithm
     """
+    # Nodes are created for every child, so __slots__ drops the per node __dict__
+    __slots__ = ("stack", "backwards_cost", "parent")
+    heuristic_cost = 0  # UCS nodes have no heuristic cost
 
-    def __init__(self, stack, backwards_cost, path):
-        self.stack = stack  # List which represents a pancake stack state
+    def __init__(self, stack, backwards_cost, parent):
+        self.stack = stack  # Bytes which represent a pancake stack state
         self.backwards_cost = backwards_cost  # Cost from root to current node
-        self.path = path  # Path from root to current node(list of stacks)
+        self.parent = parent  # Parent node(None for root)
 
-    def __eq__(self, other):
+    def reconstruct_path(self):
         """
-        Defines if current node and other node are equal based on their stack list.
-        :param other: UcsNode:Represent the other node with which the current node
-        is compared
-        :return: True if nodes stacks are equal, False otherwise
+        Walks parent nodes back to the root
+        :return: Path from root to current node(list of stacks)
         """
-        if isinstance(other, UcsNode):
-            return self.stack == other.stack
+        path = []
+        node = self
+        while node is not None:
+            path.append(node.stack)
+            node = node.parent
+        path.reverse()
+        return path
 
 
 class AStarNode(UcsNode):
@@ -28,9 +36,10 @@ class AStarNode(UcsNode):
     Inherits all  methods and properties from UcsNode class. Takes arguments
     suitable for solving the pancake flipping sort problem using A* algorithm
     """
+    __slots__ = ("heuristic_cost", "total_cost")
 
-    def __init__(self, stack, backwards_cost, path, heuristic_value):
-        super().__init__(stack, backwards_cost, path)
+    def __init__(self, stack, backwards_cost, parent, heuristic_value):
+        super().__init__(stack, backwards_cost, parent)
         self.heuristic_cost = heuristic_value  # Heuristic cost
         # Total cost(backwards + heuristic)
         self.total_cost = self.heuristic_cost + self.backwards_cost
@@ -43,70 +52,156 @@ class Ucs:
     """
 
     def __init__(self, starting_stack):
-        self.root = UcsNode(starting_stack, 0, [starting_stack])  # Root node
-        self.expanded = []  # List with expanded but not yet traversed nodes(Ανοικτές)
-        self.traversed = []  # List with nodes that have been traversed(Κλειστές)
-        self.goal_stack = sorted(self.root.stack)  # Goal stack
+        # Bytes are hashable and much more compact than a list of ints
+        starting_stack = bytes(starting_stack)
+        self.root = UcsNode(starting_stack, 0, None)  # Root node
+        self.expanded = []  # Heap with expanded but not yet traversed nodes(Ανοικτές)
+        # Stacks of nodes in self.expanded mapped to their lowest pushed cost
+        self.expanded_set = {}
+        # Stacks of nodes that have been traversed mapped to their cost(Κλειστές)
+        self.traversed_set = {}
+        self._counter = itertools.count()  # Tiebreaker for nodes with equal cost
+        self.goal_stack = bytes(sorted(starting_stack))  # Goal stack
+        # Flip operator T(n), 2 <= n <= stack length, inverts the first n
+        # pancakes of a stack: stack[flipped] + stack[rest] for the pair of
+        # slices at index n - 2. Stack length is fixed during search, so the
+        # slices are built only once
+        self.flip_slices = [(slice(n - 1, None, -1), slice(n, None))
+                            for n in range(2, len(starting_stack) + 1)]
         self.nodes_expanded = 1  # Number of expanded nodes
 
-    def get_lowest_cost_node(self):
+    @staticmethod
+    def create_node(stack, backwards_cost, parent, heuristic_value):
         """
-        Returns lowest cost node found in self.expanded list
+        Creates and returns node of stack(UCS nodes have no heuristic value)
         """
-        self.expanded.sort(key=lambda x: x.backwards_cost)
-        return self.expanded[0]
+        return UcsNode(stack, backwards_cost, parent)
 
-    def get_node_by_stack(self, stack):
+    @staticmethod
+    def calculate_heuristic_value(stack):
         """
-        Returns node found in self.expanded list based on node stack
+        Returns heuristic value of stack, which is always 0 for UCS
         """
-        for node in self.expanded:
-            if node.stack == stack:
-                return node
         return 0
 
     @staticmethod
-    def flip(stack, n):
+    def calculate_batch_heuristic_values(stack, heuristic_value):
+        """
+        Returns heuristic values of all sub stacks of stack, always 0 for UCS
+        """
+        return [0] * (len(stack) - 1)
+
+    def push_node(self, stack, backwards_cost, parent, heuristic_value):
+        """
+        Creates node of stack and pushes it to self.expanded heap keyed by its
+        total cost(backwards cost for UCS). Ties are broken in favor of the
+        lower heuristic cost(node closer to goal). Callers check
+        self.expanded_set first: old entry of a stack pushed again with a lower
+        cost stays in heap and is skipped when popped
+        :return: Pushed node
+        """
+        node = self.create_node(stack, backwards_cost, parent, heuristic_value)
+        cost = backwards_cost + heuristic_value
+        self.expanded_set[stack] = cost
+        heapq.heappush(self.expanded,
+                       (cost, heuristic_value, next(self._counter), node))
+        return node
+
+    def push_root(self):
+        """
+        Pushes node of the starting stack to self.expanded heap
+        :return: Pushed node
+        """
+        stack = self.root.stack
+        return self.push_node(stack, 0, None,
+                              self.calculate_heuristic_value(stack))
+
+    def get_lowest_cost(self):
+        """
+        Returns lowest cost found in self.expanded heap, or infinity if it is
+        empty. Entries superseded by a lower cost push of the same stack are
+        removed from the top of the heap
         """
-        Inverts "n" first elements of stack(list)
+        while self.expanded:
+            # Heap entries start with the cost and end with the node
+            entry = self.expanded[0]
+            if entry[0] == self.expanded_set.get(entry[-1].stack):
+                return entry[0]
+            heapq.heappop(self.expanded)
+        return float("inf")
+
+    def get_lowest_cost_node(self):
+        """
+        Pops and returns lowest cost node found in self.expanded heap and
+        moves its stack to self.traversed_set. Entries superseded by a lower
+        cost push of the same stack are skipped
+        """
+        while True:
+            # Heap entries start with the cost and end with the node
+            entry = heapq.heappop(self.expanded)
+            cost, node = entry[0], entry[-1]
+            if cost == self.expanded_set.get(node.stack):
+                del self.expanded_set[node.stack]
+                self.traversed_set[node.stack] = cost
+                return node
+
+    def expand_node(self, current_node):
         """
-        return stack[:n][::-1] + stack[n:]
+        Expands all sub nodes of current node, one per flip in flip_slices.
+        Nodes are only created for sub stacks that are pushed to self.expanded
+        heap: not traversed yet and not already there with lower or equal cost
+        :return: List of pushed sub nodes
+        """
+        # Bind attributes used in the loop to locals to skip attribute lookups
+        traversed_set = self.traversed_set
+        expanded_set = self.expanded_set
+        push_node = self.push_node
+        stack = current_node.stack
+        backwards_cost = current_node.backwards_cost + 1
+        sub_stacks = [stack[flipped] + stack[rest]
+                      for flipped, rest in self.flip_slices]
+        heuristic_values = self.calculate_batch_heuristic_values(
+            stack, current_node.heuristic_cost)
+        self.nodes_expanded += len(sub_stacks)
+        pushed_nodes = []
+        for sub_stack, heuristic_value in zip(sub_stacks, heuristic_values):
+            if sub_stack in traversed_set:
+                continue
+            old_cost = expanded_set.get(sub_stack)
+            if old_cost is None or \
+                    backwards_cost + heuristic_value < old_cost:
+                pushed_nodes.append(push_node(sub_stack, backwards_cost,
+                                              current_node, heuristic_value))
+        return pushed_nodes
 
     def start_search(self):
         """
-        Starts UCS search
+        Starts UCS search(A* search when called on Astar)
         """
-        self.expanded.append(self.root)
+        self.push_root()
+        # Bind attributes used in the loop to locals to skip attribute lookups
+        goal_stack = self.goal_stack
+        expand_node = self.expand_node
 
         while True:
-            # Set lowest cost node in expanded list as current node
+            # Pop lowest cost node from expanded heap and mark it as traversed
             current_node = self.get_lowest_cost_node()
-            # Remove current node from expanded and append it to traversed
-            self.expanded.remove(current_node)
-            self.traversed.append(current_node)
 
             # Goal node traversed as termination criterion:
             # If current node is goal-node then end search and return node
-            if current_node.stack == self.goal_stack:
+            if current_node.stack == goal_stack:
                 return current_node
 
+            # # Uncomment to set goal node expansion as termination criterion
+            # stack = current_node.stack
+            # for flipped, rest in self.flip_slices:
+            #     if stack[flipped] + stack[rest] == goal_stack:
+            #         return self.create_node(goal_stack,
+            #                                 current_node.backwards_cost + 1,
+            #                                 current_node, 0)
+
             # Expand all sub nodes of current node
-            for i in range(2, len(current_node.stack) + 1):
-                self.nodes_expanded += 1
-                stack = self.flip(current_node.stack, i)
-                path = current_node.path.copy()
-                path.append(stack)
-                new_node = UcsNode(stack, current_node.backwards_cost + 1, path)
-                # # Uncomment to set goal node expansion as termination criterion
-                # if new_node.stack == self.goal_stack:
-                #     return new_node
-                if new_node not in self.expanded and new_node not in self.traversed:
-                    self.expanded.append(new_node)
-                elif new_node in self.expanded:
-                    old_node = self.get_node_by_stack(new_node.stack)
-                    if new_node.backwards_cost < old_node.backwards_cost:
-                        self.expanded.remove(old_node)
-                        self.expanded.append(new_node)
+            expand_node(current_node)
 
 
 class Astar(Ucs):
@@ -117,67 +212,197 @@ class Astar(Ucs):
 
     def __init__(self, starting_stack):
         super().__init__(starting_stack)
-        self.root = AStarNode(starting_stack, 0, [starting_stack],
+        starting_stack = self.root.stack
+        self.root = AStarNode(starting_stack, 0, None,
                               self.calculate_heuristic_value(starting_stack))
 
-    def get_lowest_cost_node(self):
+    @staticmethod
+    def create_node(stack, backwards_cost, parent, heuristic_value):
         """
-        Returns lowest total cost node found in self.expanded list
+        Creates and returns node of stack
         """
-        self.expanded.sort(key=lambda x: x.total_cost)
-        return self.expanded[0]
+        return AStarNode(stack, backwards_cost, parent, heuristic_value)
 
     @staticmethod
     def calculate_heuristic_value(stack):
         """
         Calculates and returns heruistic value of stack
         """
-        heuristic_value = 0
-        i = 0
-        while i < len(stack) - 1:
-            current_pancake = stack[i]
-            current_plus_one = current_pancake - 1
-            current_minus_one = current_pancake + 1
-            # If next pancake's value isn't one number above or bellow current pancake
-            if (stack[i + 1] != current_minus_one) and \
-                    (stack[i + 1] != current_plus_one):
-                heuristic_value += 1  # Increment Nodes heuristic value
-            i += 1
+        # Count adjacent pancakes whose values aren't one number above or
+        # bellow each other. Pairing the stack with itself shifted by one keeps
+        # the loop in a single generator instead of indexing per iteration
+        heuristic_value = sum(
+            1 for current_pancake, next_pancake in zip(stack, stack[1:])
+            if abs(current_pancake - next_pancake) != 1)
+        # The plate acts as pancake n + 1 under the bottom pancake (GAP heuristic)
+        if stack[-1] != len(stack):
+            heuristic_value += 1
         return heuristic_value
 
+    @staticmethod
+    def calculate_batch_heuristic_values(stack, heuristic_value):
+        """
+        Calculates heuristic values of all sub stacks of stack at once. Flipping
+        the first n pancakes only changes the pancake lying on pancake n + 1
+        (stack[0] instead of stack[n - 1]), so each value is found from the
+        heuristic value of stack in constant time
+        :return: List of heuristic values in the order of flip_slices
+        """
+        top_pancake = stack[0]
+        # The plate acts as pancake n + 1 under the bottom pancake
+        lower_pancakes = list(stack[2:])
+        lower_pancakes.append(len(stack) + 1)
+        return [heuristic_value - (abs(upper_pancake - lower_pancake) != 1) +
+                (abs(top_pancake - lower_pancake) != 1)
+                for upper_pancake, lower_pancake in zip(stack[1:], lower_pancakes)]
+
+
+class BidirectionalAstar(Astar):
+    """
+    Implements bidirectional A* to solve the pancake flipping sort problem.
+    Searches forward from the starting stack and backward from the goal stack
+    until the two searches meet. Inherits all methods and properties from
+    Astar class, which are used for the forward search.
+    """
+
+    def __init__(self, starting_stack):
+        super().__init__(starting_stack)
+        # Every flip is its own inverse, so the backward search applies the
+        # same flips starting from the goal stack. Its stacks are relabeled by
+        # the position of each pancake in the starting stack, which makes the
+        # starting stack its sorted goal, so it is a regular A* search
+        to_backward = bytearray(range(256))
+        for position, pancake in enumerate(self.root.stack, 1):
+            to_backward[pancake] = position
+        to_forward = bytearray(range(256))
+        to_forward[1:len(self.root.stack) + 1] = self.root.stack
+        # Translation tables from stacks of a direction(0: forward,
+        # 1: backward) to stacks of the other direction
+        self.tables = (bytes(to_backward), bytes(to_forward))
+        self.backward = Astar(self.goal_stack.translate(self.tables[0]))
+        # Backward root is not expanded from the starting stack, so only sub
+        # nodes count towards nodes_expanded
+        self.backward.nodes_expanded = 0
+        # Lowest cost node reached for each stack, one dict per direction
+        self.best_nodes = ({}, {})
+
+    def join_paths(self, forward_node, backward_node):
+        """
+        Extends forward node with the path of backward node back to the goal
+        :return: Goal node whose path passes through both nodes
+        """
+        node = forward_node
+        backward_node = backward_node.parent
+        while backward_node is not None:
+            stack = backward_node.stack.translate(self.tables[1])
+            node = UcsNode(stack, node.backwards_cost + 1, node)
+            backward_node = backward_node.parent
+        return node
+
     def start_search(self):
         """
-        Starts A* search
+        Starts bidirectional A* search
         """
-        self.root.heuristic_cost = self.calculate_heuristic_value(self.root.stack)
-        self.expanded.append(self.root)
-        while True:
-            # Set lowest cost node in expanded list as current node
-            current_node = self.get_lowest_cost_node()
-            # Remove current node from expanded and append it to traversed
-            self.expanded.remove(current_node)
-            self.traversed.append(current_node)
+        if self.root.stack == self.goal_stack:
+            return self.root
+        searches = (self, self.backward)  # Forward and backward search
+        for search, best_nodes in zip(searches, self.best_nodes):
+            best_nodes[search.root.stack] = search.push_root()
+        best_cost = float("inf")  # Cost of cheapest path found so far
+        meeting_nodes = None  # Forward and backward node of that path
 
-            # If current node is goal-node then end search and return node
-            if current_node.stack == self.goal_stack:
-                return current_node
+        while True:
+            lowest_costs = (self.get_lowest_cost(), self.backward.get_lowest_cost())
+            # Heuristic is admissible, so no path through a node that is still
+            # in expanded can be cheaper than the lowest total cost of its heap
+            if best_cost <= max(lowest_costs):
+                self.nodes_expanded += self.backward.nodes_expanded
+                return self.join_paths(*meeting_nodes)
+
+            # Continue the direction with the lowest total cost node
+            direction = 0 if lowest_costs[0] <= lowest_costs[1] else 1
+            search = searches[direction]
+            best_nodes = self.best_nodes[direction]
+            other_best_nodes = self.best_nodes[1 - direction]
+            table = self.tables[direction]
+            current_node = search.get_lowest_cost_node()
 
             # Expand all sub nodes of current node
-            for i in range(2, len(current_node.stack) + 1):
-                self.nodes_expanded += 1
-                stack = self.flip(current_node.stack, i)
-                path = current_node.path.copy()
-                path.append(stack)
-                heuristic_value = self.calculate_heuristic_value(stack)
-                new_node = AStarNode(stack, current_node.backwards_cost + 1,
-                                     path, heuristic_value)
-                if new_node not in self.expanded and new_node not in self.traversed:
-                    self.expanded.append(new_node)
-                elif new_node in self.expanded:
-                    old_node = self.get_node_by_stack(new_node.stack)
-                    if new_node.total_cost < old_node.total_cost:
-                        self.expanded.remove(old_node)
-                        self.expanded.append(new_node)
+            for new_node in search.expand_node(current_node):
+                best_nodes[new_node.stack] = new_node
+                # If the other direction has reached this stack too, the two
+                # paths joined form a path from starting stack to goal stack
+                other_node = other_best_nodes.get(new_node.stack.translate(table))
+                if other_node is not None and best_cost > \
+                        new_node.backwards_cost + other_node.backwards_cost:
+                    best_cost = (new_node.backwards_cost +
+                                 other_node.backwards_cost)
+                    if direction == 0:
+                        meeting_nodes = (new_node, other_node)
+                    else:
+                        meeting_nodes = (other_node, new_node)
+
+
+class IDAstar(Astar):
+    """
+    Implements the Iterative Deepening A* algorithm to solve the pancake flipping
+    sort problem. Repeats depth first searches that skip nodes whose total cost
+    exceeds a bound, raising the bound each time, so only the nodes of the
+    current branch are kept in memory. Inherits all methods and properties from
+    Astar class.
+    """
+
+    def bounded_search(self, bound):
+        """
+        Depth first search from root that skips nodes with total cost over bound
+        :return: Goal node(None if not found) and lowest total cost over bound
+        """
+        goal_stack = self.goal_stack
+        flip_slices = self.flip_slices
+        calculate_batch_heuristic_values = self.calculate_batch_heuristic_values
+        next_bound = float("inf")
+        nodes = [self.root]  # Nodes left to traverse(last one is traversed first)
+
+        while nodes:
+            current_node = nodes.pop()
+            if current_node.stack == goal_stack:
+                return current_node, bound
+
+            # Expand all sub nodes of current node. Total cost is checked
+            # against bound before the sub stack or its node is created
+            current_stack = current_node.stack
+            backwards_cost = current_node.backwards_cost + 1
+            # Flips are their own inverse, so one sub stack is the parent stack
+            parent_stack = current_node.parent.stack \
+                if current_node.parent is not None else None
+            heuristic_values = calculate_batch_heuristic_values(
+                current_stack, current_node.heuristic_cost)
+            self.nodes_expanded += len(heuristic_values)
+            sub_nodes = []
+            for (flipped, rest), heuristic_value in zip(flip_slices,
+                                                        heuristic_values):
+                total_cost = backwards_cost + heuristic_value
+                if total_cost > bound:
+                    next_bound = min(next_bound, total_cost)
+                    continue
+                stack = current_stack[flipped] + current_stack[rest]
+                if stack != parent_stack:
+                    sub_nodes.append(AStarNode(stack, backwards_cost,
+                                               current_node, heuristic_value))
+            # Traverse sub nodes with lower heuristic cost first
+            sub_nodes.sort(key=lambda x: x.heuristic_cost, reverse=True)
+            nodes.extend(sub_nodes)
+        return None, next_bound
+
+    def start_search(self):
+        """
+        Starts IDA* search
+        """
+        bound = self.root.total_cost
+        while True:
+            target_node, bound = self.bounded_search(bound)
+            if target_node is not None:
+                return target_node
 
 
 class FlippingSort:
@@ -206,6 +431,11 @@ class FlippingSort:
         Validates that stack contains numbers 1 to n
         :return: True if stack is valid, False otherwise
         """
+        # Stacks are stored as bytes during search
+        if len(starting_stack) > 255:
+            print(f"Error: Stack can contain at most 255 pancakes. "
+                  f"You inputted {len(starting_stack)}. Try again")
+            return False
         starting_stack_set = set(starting_stack)
         # Check if stack contains duplicates
         if len(starting_stack) != len(starting_stack_set):
@@ -228,12 +458,11 @@ class FlippingSort:
         Prints results of search
         """
 
+        path = target_node.reconstruct_path()
         print("Optimal path:")
-        for stack in target_node.path:
-            if stack != target_node.path[0]:
-                print(" -> ")
-            print(stack, end="")
-        print(f"\nPath cost: {target_node.backwards_cost}.\n"
+        # Whole path is joined first and written with a single print call
+        print(" -> \n".join(str(list(stack)) for stack in path))
+        print(f"Path cost: {target_node.backwards_cost}.\n"
               f"Number of expanded nodes: {nodes_expanded}.\n"
               f"Time elapsed: {time_elapsed} sec.")
 
@@ -267,6 +496,14 @@ def main():
     print("\nA* results:")
     fs.print_results(target_node, a_star.nodes_expanded, astar_elapsed_time)
 
+    # Run IDA* search
+    ida_star = IDAstar(starting_stack)
+    start_time = timer()
+    target_node = ida_star.start_search()
+    idastar_elapsed_time = timer() - start_time
+    print("\nIDA* results:")
+    fs.print_results(target_node, ida_star.nodes_expanded, idastar_elapsed_time)
+
     print(f"\nA* was {ucs_elapsed_time - astar_elapsed_time} "
           f"seconds faster than UCS.")
     print(f"A* expanded {ucs.nodes_expanded - a_star.nodes_expanded}"
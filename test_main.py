@@ -0,0 +1,77 @@
+import itertools
+import unittest
+from collections import deque
+
+from main import Astar, BidirectionalAstar, IDAstar
+
+
+def calculate_optimal_costs(n):
+    """
+    Breadth first search from the sorted stack of n pancakes. Flips are their
+    own inverse, so distance from the sorted stack equals distance to it
+    :return: Dict mapping every stack(bytes) to its optimal path cost
+    """
+    goal_stack = bytes(range(1, n + 1))
+    costs = {goal_stack: 0}
+    stacks = deque([goal_stack])
+    while stacks:
+        stack = stacks.popleft()
+        for k in range(2, n + 1):
+            sub_stack = stack[k - 1::-1] + stack[k:]
+            if sub_stack not in costs:
+                costs[sub_stack] = costs[stack] + 1
+                stacks.append(sub_stack)
+    return costs
+
+
+class TestBatchHeuristicValues(unittest.TestCase):
+
+    def test_matches_heuristic_value_of_every_sub_stack(self):
+        """
+        Checks calculate_batch_heuristic_values against
+        calculate_heuristic_value for every stack of up to 8 pancakes
+        """
+        for n in range(2, 9):
+            for permutation in itertools.permutations(range(1, n + 1)):
+                stack = bytes(permutation)
+                sub_stacks = [stack[k - 1::-1] + stack[k:]
+                              for k in range(2, n + 1)]
+                expected = [Astar.calculate_heuristic_value(sub_stack)
+                            for sub_stack in sub_stacks]
+                heuristic_value = Astar.calculate_heuristic_value(stack)
+                self.assertEqual(
+                    Astar.calculate_batch_heuristic_values(stack,
+                                                           heuristic_value),
+                    expected, msg=list(stack))
+
+
+class TestOptimalPathCost(unittest.TestCase):
+
+    def check_search(self, search_class, max_n):
+        """
+        Checks path found by search_class against breadth first search for
+        every stack of up to max_n pancakes
+        """
+        for n in range(1, max_n + 1):
+            goal_stack = bytes(range(1, n + 1))
+            for stack, cost in calculate_optimal_costs(n).items():
+                target_node = search_class(stack).start_search()
+                self.assertEqual(target_node.backwards_cost, cost,
+                                 msg=list(stack))
+                path = target_node.reconstruct_path()
+                self.assertEqual((path[0], path[-1]), (stack, goal_stack))
+                # Every step of the path must be a single flip
+                for current_stack, next_stack in zip(path, path[1:]):
+                    self.assertIn(next_stack,
+                                  [current_stack[k - 1::-1] + current_stack[k:]
+                                   for k in range(2, n + 1)])
+
+    def test_ida_star(self):
+        self.check_search(IDAstar, 7)
+
+    def test_bidirectional_a_star(self):
+        self.check_search(BidirectionalAstar, 7)
+
+
+if __name__ == "__main__":
+    unittest.main()